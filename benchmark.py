@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+import time
+
+from main import build_index, index_values, make_item
+
+WORDS = ["ống", "đồng", "phi", "thép", "tấm", "mm", "dây", "điện", "cáp",
+         "vít", "bu", "lông", "ốc", "nhựa", "van", "khóa", "co", "tê"]
+GROUPS = ["Điện", "Nước", "Cơ khí", "Điện lạnh"]
+
+def make_catalog(count):
+    """Generate a synthetic catalog with realistic codes, names and groups"""
+    rng = random.Random(0)
+    return [
+        make_item({
+            "code": f"VT{i:07d}",
+            "name": " ".join(rng.choices(WORDS, k=4)) + f" {rng.randint(1, 200)}",
+            "group": rng.choice(GROUPS),
+        })
+        for i in range(count)
+    ]
+
+def time_build(rows, workers):
+    start = time.perf_counter()
+    build_index(rows, workers)
+    return time.perf_counter() - start
+
+def run_benchmark(count, workers):
+    print(f"Generating {count} items...")
+    rows = [index_values(item) for item in make_catalog(count)]
+
+    serial = time_build(rows, 1)
+    print(f"Serial build:            {serial:.2f} s")
+
+    if workers > 1:
+        pooled = time_build(rows, workers)
+        print(f"Pooled build ({workers} workers): {pooled:.2f} s ({serial / pooled:.1f}x)")
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py [items] [workers]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    run_benchmark(count, workers)
@@ -6,8 +6,226 @@ import os
 import sys
 import json
 import re
+import unicodedata
 from tkinter import font
 from functools import lru_cache
+from array import array
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Catalogs smaller than this are indexed in-process (pool startup costs more)
+INDEX_PARALLEL_THRESHOLD = 50000
+# Number of shards handed to each worker process
+INDEX_SHARDS_PER_WORKER = 4
+
+# Extra Excel columns kept on import: field name used in queries -> column header
+EXTRA_COLUMNS = {
+    "unit": "ĐVT",
+    "group": "Nhóm VT",
+    "supplier": "Nhà cung cấp",
+}
+# Fields with their own index, usable as "field:value" in the search box
+INDEX_FIELDS = ("code", "name") + tuple(EXTRA_COLUMNS)
+# Fields indexed by token. Codes are nearly unique, so a token per code would
+# cost one posting per item; they are matched by scanning a code column instead
+TOKEN_FIELDS = ("name",) + tuple(EXTRA_COLUMNS)
+
+# Usage counters are appended here (next to data.json) on every copy/bookmark
+USAGE_FILE = "usage.jsonl"
+USAGE_COUNTERS = ("copies", "bookmarks")
+# Size of the "most used" list shown for empty and one-character queries
+HOT_ITEMS_LIMIT = 20
+
+
+def normalize_text(text):
+    """Lowercase text and strip Vietnamese diacritics (e.g. 'Ống đồng' -> 'ong dong')"""
+    text = unicodedata.normalize('NFD', text.lower()).replace('đ', 'd')
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def make_item(record):
+    """Build an item dict with preprocessing fields from a saved/imported record"""
+    item = {}
+    for field in INDEX_FIELDS:
+        value = str(record.get(field, "")).strip()
+        item[field] = value
+        item[f"{field}_lower"] = normalize_text(value)
+    return item
+
+
+def item_record(item):
+    """Return the fields of an item that are saved to data.json"""
+    record = {"code": item["code"], "name": item["name"]}
+    for field in EXTRA_COLUMNS:
+        if item.get(field):
+            record[field] = item[field]
+    return record
+
+
+def tokenize_field(field, value):
+    """Return the set of index tokens for a lowercased field value"""
+    tokens = set(re.findall(r'\w+', value))
+    if field != "name" and value:
+        # Extra columns have few distinct values, so index the whole value too
+        tokens.add(value)
+    return tokens
+
+
+def index_values(item):
+    """Return the lowercased values of TOKEN_FIELDS for an item"""
+    return tuple(item[f"{field}_lower"] for field in TOKEN_FIELDS)
+
+
+def item_tokens(values):
+    """Return the token set of each field for an item's index values"""
+    return {field: tokenize_field(field, value) for field, value in zip(TOKEN_FIELDS, values)}
+
+
+def add_postings(postings, tokens, i):
+    """Append item index i to the posting array of every token"""
+    for token in tokens:
+        posting = postings.get(token)
+        if posting is None:
+            posting = postings[token] = array('I')
+        posting.append(i)
+
+
+def insert_postings(postings, tokens, i):
+    """Insert item index i into the posting array of every token, keeping it sorted"""
+    for token in tokens:
+        posting = postings.get(token)
+        if posting is None:
+            postings[token] = array('I', [i])
+        else:
+            insort(posting, i)
+
+
+def remove_postings(postings, tokens, i):
+    """Remove item index i from the posting array of every token"""
+    for token in tokens:
+        posting = postings.get(token)
+        if posting is None:
+            continue
+        pos = bisect_left(posting, i)
+        if pos < len(posting) and posting[pos] == i:
+            del posting[pos]
+            if not posting:
+                del postings[token]
+
+
+def build_shard_postings(shard):
+    """Tokenize one shard of the catalog and return its postings per field.
+
+    `shard` is a (start, rows) tuple where rows hold the index values of
+    TOKEN_FIELDS. Each posting is a sorted array of global item indices.
+    """
+    start, rows = shard
+    per_field = {field: {} for field in TOKEN_FIELDS}
+    for offset, values in enumerate(rows):
+        i = start + offset
+        for field, tokens in item_tokens(values).items():
+            add_postings(per_field[field], tokens, i)
+    return per_field
+
+
+def pack_postings(postings):
+    """Flatten {token: array} into (tokens, offsets, indices).
+
+    A few flat arrays pickle and unpickle far faster than one small array
+    per token.
+    """
+    tokens = list(postings)
+    offsets = array('I', [0])
+    indices = array('I')
+    for token in tokens:
+        indices.extend(postings[token])
+        offsets.append(len(indices))
+    return tokens, offsets, indices
+
+
+def build_packed_shard(shard):
+    """Worker entry point: build a shard's postings and pack them for the parent.
+
+    Kept at module level so it can be pickled into worker processes.
+    """
+    return {field: pack_postings(postings)
+            for field, postings in build_shard_postings(shard).items()}
+
+
+def merge_packed_postings(index, packed):
+    """Merge a later shard's packed postings into index in place"""
+    tokens, offsets, indices = packed
+    for n, token in enumerate(tokens):
+        posting = indices[offsets[n]:offsets[n + 1]]
+        merged = index.get(token)
+        if merged is None:
+            index[token] = posting
+        else:
+            # Shards cover increasing index ranges, so appending keeps it sorted
+            merged.extend(posting)
+
+
+def build_index(rows, workers):
+    """Build the postings of every TOKEN_FIELDS field for rows of index values.
+
+    Large catalogs are split into shards that are tokenized in a process
+    pool; packed shard postings are merged in shard order as they arrive.
+    """
+    if len(rows) < INDEX_PARALLEL_THRESHOLD or workers < 2:
+        return build_shard_postings((0, rows))
+    
+    shard_size = -(-len(rows) // (workers * INDEX_SHARDS_PER_WORKER))
+    shards = [(start, rows[start:start + shard_size])
+              for start in range(0, len(rows), shard_size)]
+    try:
+        per_field = {field: {} for field in TOKEN_FIELDS}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for packed in pool.map(build_packed_shard, shards):
+                for field, postings in packed.items():
+                    merge_packed_postings(per_field[field], postings)
+        return per_field
+    except Exception:
+        # Process pool unavailable (e.g. restricted environment), index in-process
+        return build_shard_postings((0, rows))
+
+
+def parse_query(query):
+    """Split a normalized query into (field, value) clauses, one per term.
+
+    Terms written as "field:value" with a known field are scoped to that
+    field; other terms are free text (field None) matched against code and
+    name. All clauses must match, in any order.
+    """
+    clauses = []
+    for term in query.split():
+        field, sep, value = term.partition(":")
+        if sep and value and field in INDEX_FIELDS:
+            clauses.append((field, value))
+        else:
+            clauses.append((None, term))
+    return clauses
+
+
+def postings_to_bitset(postings, size):
+    """Combine posting arrays into an int bitset where bit i marks item i"""
+    bits = bytearray((size + 7) // 8)
+    for posting in postings:
+        for i in posting:
+            bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def bitset_indices(bitset):
+    """Return the positions of the set bits of an int bitset, in increasing order"""
+    bits = bin(bitset)[:1:-1]
+    indices = []
+    i = bits.find('1')
+    while i >= 0:
+        indices.append(i)
+        i = bits.find('1', i + 1)
+    return indices
+
 
 class QLVTApp:
     def __init__(self, root):
@@ -22,14 +240,22 @@ class QLVTApp:
         # Data storage
         self.items = []
         self.filtered_items = []
+        self.is_filtering = False
         self.bookmarked_items = []
         self.status_message = ""
         self.status_timer = None
         self.search_timer = None
         self.last_query = ""
         
-        # Search index for faster lookups
+        # Search index for faster lookups (code + name) and one index per field
         self.search_index = {}
+        self.field_indexes = {}
+        self.code_keys = []
+        self.item_indexes = {}
+        
+        # Usage counters per item code and the cached most used items
+        self.usage_counts = {}
+        self.hot_items = []
         
         # Create custom styles
         self.setup_styles()
@@ -38,6 +264,7 @@ class QLVTApp:
         self.create_ui()
         
         # Load existing data if available
+        self.load_usage()
         self.load_data()
     
     def create_ui(self):
@@ -207,6 +434,7 @@ class QLVTApp:
             # Add to bookmarks
             self.bookmarked_items.append(item)
             self.show_status_message("✅ Đã đánh dấu")
+            self.record_usage(item["code"], "bookmarks")
         
         # Save changes
         self.save_data()
@@ -221,11 +449,14 @@ class QLVTApp:
         for widget in self.items_frame.winfo_children():
             widget.destroy()
         
-        # Get items to display
-        items_to_display = self.filtered_items if self.filtered_items else self.items
+        # Get items to display (most used items when not filtering, if any)
+        if self.is_filtering:
+            items_to_display = self.filtered_items
+        else:
+            items_to_display = self.hot_items or self.items
         
         # Display bookmarked items first
-        if self.bookmarked_items and not self.filtered_items:
+        if self.bookmarked_items and not self.is_filtering:
             for index, item in enumerate(self.bookmarked_items):
                 self.create_item_widget(item, index, self.bookmarked_frame)
             self.separator.pack(fill=tk.X, pady=5)
@@ -234,8 +465,10 @@ class QLVTApp:
         
         # Display other items
         for index, item in enumerate(items_to_display):
-            if not self.filtered_items and any(b['code'] == item['code'] for b in self.bookmarked_items):
+            if not self.is_filtering and any(b['code'] == item['code'] for b in self.bookmarked_items):
                 continue  # Skip if item is bookmarked and we're not filtering
+            if items_to_display is not self.items:
+                index = self.catalog_index(item)  # Editing needs the catalog position
             self.create_item_widget(item, index)
         
         # Update the canvas scrollregion
@@ -295,6 +528,49 @@ class QLVTApp:
     def copy_item_code(self, item):
         pyperclip.copy(item["code"])
         self.show_status_message("✅ Đã copy")
+        self.record_usage(item["code"], "copies")
+    
+    def catalog_index(self, item):
+        """Return the position of an item in self.items"""
+        index = self.item_indexes.get(item["code"])
+        if index is None or self.items[index] is not item:
+            # Items sharing a code map to the first one, find this one by identity
+            index = next(i for i, other in enumerate(self.items) if other is item)
+        return index
+    
+    def usage_score(self, code):
+        """Ranking boost of an item: total copies and bookmark hits"""
+        counts = self.usage_counts.get(code)
+        return sum(counts.values()) if counts else 0
+    
+    def record_usage(self, code, counter):
+        """Count a copy/bookmark hit and append it to the usage file"""
+        counts = self.usage_counts.setdefault(code, dict.fromkeys(USAGE_COUNTERS, 0))
+        counts[counter] += 1
+        self.update_hot_items(code)
+        
+        try:
+            with open(self.data_file_path(USAGE_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"code": code, counter: 1}, ensure_ascii=False) + "\n")
+        except Exception as e:
+            self.show_status_message(f"❌ Lỗi lưu dữ liệu: {str(e)}")
+    
+    def update_hot_items(self, code):
+        """Move an item into/within the most used list after its counter changed"""
+        if code not in self.item_indexes:
+            return
+        item = self.items[self.item_indexes[code]]
+        
+        if not any(hot is item for hot in self.hot_items):
+            self.hot_items.append(item)
+        self.hot_items.sort(key=lambda hot: -self.usage_score(hot["code"]))
+        del self.hot_items[HOT_ITEMS_LIMIT:]
+    
+    def rebuild_hot_items(self):
+        """Recompute the most used list from the usage counters"""
+        used_codes = [code for code in self.usage_counts if code in self.item_indexes]
+        used_codes.sort(key=lambda code: -self.usage_score(code))
+        self.hot_items = [self.items[self.item_indexes[code]] for code in used_codes[:HOT_ITEMS_LIMIT]]
     
     def show_status_message(self, message, duration=2000):
         # Clear any existing timer
@@ -328,13 +604,20 @@ class QLVTApp:
                 )
                 return
             
+            # Extra columns present in this workbook
+            extra_columns = {field: column for field, column in EXTRA_COLUMNS.items()
+                             if column in df.columns}
+            
             # Extract relevant columns and convert to list of dictionaries
-            self.items = [
-                {"code": str(row["Mã VT"]).strip(), "name": str(row["Tên VT"]).strip(),
-                 "code_lower": str(row["Mã VT"]).strip().lower(), "name_lower": str(row["Tên VT"]).strip().lower()}
-                for _, row in df.iterrows()
-                if pd.notna(row["Mã VT"]) and pd.notna(row["Tên VT"])
-            ]
+            self.items = []
+            for _, row in df.iterrows():
+                if pd.isna(row["Mã VT"]) or pd.isna(row["Tên VT"]):
+                    continue
+                record = {"code": row["Mã VT"], "name": row["Tên VT"]}
+                for field, column in extra_columns.items():
+                    if pd.notna(row[column]):
+                        record[field] = row[column]
+                self.items.append(make_item(record))
             
             # Build search index
             self.build_search_index()
@@ -342,6 +625,7 @@ class QLVTApp:
             # Reset search and display items
             self.search_var.set("")
             self.filtered_items = []
+            self.is_filtering = False
             self.display_items()
             
             # Save data
@@ -362,18 +646,26 @@ class QLVTApp:
         self.search_timer = self.root.after(300, self.perform_search)
     
     def perform_search(self):
-        # Get search query
-        query = self.search_var.get().lower()
+        # Get search query (whitespace alone is an empty query)
+        query = self.search_var.get().strip().lower()
         
         # If query is same as last search, skip processing
         if query == self.last_query:
             return
             
         self.last_query = query
+        self.is_filtering = bool(query)
         
         if not query:
-            # If search is empty, show all items
+            # If search is empty, show bookmarks and most used items
             self.filtered_items = []
+        elif len(query) == 1 and self.hot_items:
+            # One character: filter the most used list, fall back to a full search
+            value = normalize_text(query)
+            self.filtered_items = [item for item in self.hot_items
+                                   if self.clause_matches(item, None, value)]
+            if not self.filtered_items:
+                self.filtered_items = self.search_items(query)
         else:
             # Use optimized search
             self.filtered_items = self.search_items(query)
@@ -382,61 +674,145 @@ class QLVTApp:
         self.display_items()
     
     def build_search_index(self):
-        """Build an index to speed up searches"""
-        self.search_index = {}
-        
-        # Add words from both codes and names to the index
+        """Build an index to speed up searches
+
+        Maps each name word (and extra column token) to a sorted array of item
+        indices; codes are kept as a column and scanned. Large catalogs are
+        split into shards that are tokenized in a process pool and merged.
+        """
+        self.field_indexes = build_index([index_values(item) for item in self.items],
+                                         os.cpu_count() or 1)
+        self.search_index = self.field_indexes["name"]
+        self.code_keys = [item["code_lower"] for item in self.items]
+        
+        # Cached word lookups and bitsets refer to the previous index
+        self.get_matching_words.cache_clear()
+        self.clause_bitset.cache_clear()
+        
+        # Usage is counted per code; items sharing a code map to the first one
+        self.item_indexes = {}
         for i, item in enumerate(self.items):
-            # Add whole code
-            code = item["code_lower"]
-            if code not in self.search_index:
-                self.search_index[code] = []
-            self.search_index[code].append(i)
-            
-            # Add parts of the code (e.g., for 'VT001', index 'VT' and '001')
-            code_parts = re.findall(r'[a-z]+|\d+', code)
-            for part in code_parts:
-                if part not in self.search_index:
-                    self.search_index[part] = []
-                if i not in self.search_index[part]:
-                    self.search_index[part].append(i)
-            
-            # Add words from name
-            name = item["name_lower"]
-            words = re.findall(r'\w+', name)
-            for word in words:
-                if word not in self.search_index:
-                    self.search_index[word] = []
-                if i not in self.search_index[word]:
-                    self.search_index[word].append(i)
+            self.item_indexes.setdefault(item["code"], i)
+        self.rebuild_hot_items()
+    
+    def reindex_item(self, index, old_values):
+        """Move an edited item from the postings of its old values to its new ones"""
+        old_tokens = item_tokens(old_values)
+        new_tokens = item_tokens(index_values(self.items[index]))
+        
+        for field in TOKEN_FIELDS:
+            remove_postings(self.field_indexes[field], old_tokens[field] - new_tokens[field], index)
+            insert_postings(self.field_indexes[field], new_tokens[field] - old_tokens[field], index)
+        self.code_keys[index] = self.items[index]["code_lower"]
+        
+        # Cached word lookups and bitsets refer to the previous postings
+        self.get_matching_words.cache_clear()
+        self.clause_bitset.cache_clear()
+    
+    def rename_item_code(self, index, old_code, code):
+        """Move the code mapping and usage counters of an edited item to its new code"""
+        # Items sharing a code map to the first one, which may now be another item
+        if self.item_indexes.get(old_code) == index:
+            del self.item_indexes[old_code]
+            old_key = normalize_text(old_code)
+            for i, key in enumerate(self.code_keys):
+                if key == old_key and self.items[i]["code"] == old_code:
+                    self.item_indexes[old_code] = i
+                    break
+        if index < self.item_indexes.get(code, len(self.items)):
+            self.item_indexes[code] = index
+        
+        # Add the old counters to any the new code already had
+        if old_code in self.usage_counts:
+            old_counts = self.usage_counts.pop(old_code)
+            counts = self.usage_counts.setdefault(code, dict.fromkeys(USAGE_COUNTERS, 0))
+            for counter in USAGE_COUNTERS:
+                counts[counter] += old_counts.get(counter, 0)
+            self.save_usage()
+        
+        self.rebuild_hot_items()
     
     @lru_cache(maxsize=128)
-    def get_matching_words(self, query):
-        """Get all words from the index that contain the query"""
-        return [word for word in self.search_index.keys() if query in word]
+    def get_matching_words(self, query, field=None):
+        """Get all words from the index (or a field's index) that contain the query"""
+        index = self.search_index if field is None else self.field_indexes[field]
+        return [word for word in index.keys() if query in word]
+    
+    def matching_codes(self, value):
+        """Return the indices of the items whose code contains value"""
+        return [i for i, key in enumerate(self.code_keys) if value in key]
+    
+    def clause_postings(self, field, value):
+        """Return the postings matching a clause, or None if it needs a direct scan
+
+        Names (and free text) are indexed by word, so only values made of word
+        characters can be answered from the index; extra columns also index
+        their whole value and codes are scanned from the code column.
+        """
+        if len(value) < 2:
+            return None
+        if field == "code":
+            return [self.matching_codes(value)]
+        if field in (None, "name") and not re.fullmatch(r'\w+', value):
+            return None
+        index = self.search_index if field is None else self.field_indexes[field]
+        postings = [index[word] for word in self.get_matching_words(value, field)]
+        if field is None:
+            postings.append(self.matching_codes(value))
+        return postings
+    
+    def clause_matches(self, item, field, value):
+        """Check a clause directly against an item"""
+        if field is None:
+            return value in item["code_lower"] or value in item["name_lower"]
+        return value in item[f"{field}_lower"]
+    
+    @lru_cache(maxsize=256)
+    def clause_bitset(self, field, value):
+        """Return (bitset, match count) for an indexable clause, or None"""
+        postings = self.clause_postings(field, value)
+        if postings is None:
+            return None
+        bitset = postings_to_bitset(postings, len(self.items))
+        return bitset, bin(bitset).count("1")
     
     def search_items(self, query):
-        """Optimized search using the index"""
-        # For very short queries, fall back to direct search
-        if len(query) < 2:
-            return [item for item in self.items 
-                   if query in item["code_lower"] or query in item["name_lower"]]
-        
-        # Get all words that contain the query
-        matching_words = self.get_matching_words(query)
-        
-        # Get item indices for these words
-        matching_indices = set()
-        for word in matching_words:
-            matching_indices.update(self.search_index[word])
-        
-        # Direct match for query in code or name
-        for i, item in enumerate(self.items):
-            if query in item["code_lower"] or query in item["name_lower"]:
-                matching_indices.add(i)
-        
-        # Return items at these indices
-        return [self.items[i] for i in matching_indices]
+        """Optimized search using the index
+
+        Every term of the query must match (AND). Indexable terms are turned
+        into cached bitsets and intersected sparsest first; the remaining
+        terms are checked directly on the surviving candidates.
+        """
+        bitsets = []
+        scans = []
+        for field, value in parse_query(normalize_text(query)):
+            clause = self.clause_bitset(field, value)
+            if clause is None:
+                scans.append((field, value))
+            else:
+                bitsets.append(clause)
+        
+        if bitsets:
+            bitsets.sort(key=lambda clause: clause[1])
+            matching = bitsets[0][0]
+            for bitset, count in bitsets[1:]:
+                matching &= bitset
+                if not matching:
+                    return []
+            matching_indices = bitset_indices(matching)
+        else:
+            matching_indices = range(len(self.items))
+        
+        for field, value in scans:
+            matching_indices = [i for i in matching_indices
+                                if self.clause_matches(self.items[i], field, value)]
+        
+        # Return items at these indices, most used first
+        results = [self.items[i] for i in matching_indices]
+        if self.usage_counts:
+            # Stable sort, so unused items keep their catalog order
+            results.sort(key=lambda item: -self.usage_score(item["code"]))
+        return results
     
     def edit_item(self, item, index):
         # Create a dialog for editing
@@ -500,10 +876,16 @@ class QLVTApp:
         # Update item in the list
         if index < len(self.items):
             old_code = self.items[index]["code"]
+            old_values = index_values(self.items[index])
             self.items[index]["code"] = code
             self.items[index]["name"] = name
-            self.items[index]["code_lower"] = code.lower()
-            self.items[index]["name_lower"] = name.lower()
+            self.items[index]["code_lower"] = normalize_text(code)
+            self.items[index]["name_lower"] = normalize_text(name)
+            self.reindex_item(index, old_values)
+            
+            # Keep the code mapping and usage counters with the renamed code
+            if code != old_code:
+                self.rename_item_code(index, old_code, code)
             
             # Find and update the item widget
             for widget in self.items_frame.winfo_children():
@@ -518,8 +900,8 @@ class QLVTApp:
             if item["code"] == old_code:
                 self.bookmarked_items[i]["code"] = code
                 self.bookmarked_items[i]["name"] = name
-                self.bookmarked_items[i]["code_lower"] = code.lower()
-                self.bookmarked_items[i]["name_lower"] = name.lower()
+                self.bookmarked_items[i]["code_lower"] = normalize_text(code)
+                self.bookmarked_items[i]["name_lower"] = normalize_text(name)
                 # Find and update the bookmarked item widget
                 for widget in self.bookmarked_frame.winfo_children():
                     if isinstance(widget, ttk.Frame):
@@ -528,6 +910,10 @@ class QLVTApp:
                                 child.configure(text=f"{code} - {name}")
                                 break
         
+        # Refresh the current search results (also when the search box is empty)
+        self.last_query = None
+        self.perform_search()
+        
         # Close dialog
         dialog.destroy()
         
@@ -615,28 +1001,67 @@ class QLVTApp:
             # Reset drag data
             self.drag_data = {"widget": None, "index": -1, "y_pos": 0, "is_bookmark": False}
     
+    def data_file_path(self, filename):
+        """Return the path of a data file next to the script or executable"""
+        # Get the directory containing the executable in PyInstaller bundle
+        if getattr(sys, 'frozen', False):
+            application_path = os.path.dirname(sys.executable)
+        else:
+            application_path = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(application_path, filename)
+    
+    def save_usage(self):
+        """Rewrite the usage file with one compacted line per item code"""
+        try:
+            with open(self.data_file_path(USAGE_FILE), 'w', encoding='utf-8') as f:
+                for code, counts in self.usage_counts.items():
+                    f.write(json.dumps({"code": code, **counts}, ensure_ascii=False) + "\n")
+        except Exception as e:
+            self.show_status_message(f"❌ Lỗi lưu dữ liệu: {str(e)}")
+    
+    def load_usage(self):
+        """Load usage counters by replaying the usage file"""
+        try:
+            usage_file = self.data_file_path(USAGE_FILE)
+            if not os.path.exists(usage_file):
+                return
+            
+            line_count = 0
+            damaged = False
+            self.usage_counts = {}
+            with open(usage_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line_count += 1
+                    try:
+                        entry = json.loads(line)
+                        code = entry["code"]
+                        events = [entry.get(counter, 0) for counter in USAGE_COUNTERS]
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        # Skip a line cut short by an interrupted write or otherwise invalid
+                        damaged = True
+                        continue
+                    counts = self.usage_counts.setdefault(code, dict.fromkeys(USAGE_COUNTERS, 0))
+                    for counter, count in zip(USAGE_COUNTERS, events):
+                        if isinstance(count, int):
+                            counts[counter] += count
+            
+            # Rewrite the file if a bad line was skipped, so the next append starts on a
+            # fresh line, or once it holds many more events than item codes
+            if damaged or line_count > 2 * len(self.usage_counts) + 100:
+                self.save_usage()
+        except Exception as e:
+            self.show_status_message(f"❌ Lỗi tải dữ liệu: {str(e)}")
+    
     def save_data(self):
         """Save items data to a JSON file"""
         try:
             # Remove preprocessing fields before saving
             save_data = {
-                "items": [
-                    {"code": item["code"], "name": item["name"]}
-                    for item in self.items
-                ],
-                "bookmarks": [
-                    {"code": item["code"], "name": item["name"]}
-                    for item in self.bookmarked_items
-                ]
+                "items": [item_record(item) for item in self.items],
+                "bookmarks": [item_record(item) for item in self.bookmarked_items]
             }
                 
-            # Get the directory containing the executable in PyInstaller bundle
-            if getattr(sys, 'frozen', False):
-                application_path = os.path.dirname(sys.executable)
-            else:
-                application_path = os.path.dirname(os.path.abspath(__file__))
-            
-            data_file = os.path.join(application_path, "data.json")
+            data_file = self.data_file_path("data.json")
             with open(data_file, 'w', encoding='utf-8') as f:
                 json.dump(save_data, f, ensure_ascii=False, indent=2)
         except Exception as e:
@@ -645,13 +1070,7 @@ class QLVTApp:
     def load_data(self):
         """Load items data from JSON file if it exists"""
         try:
-            # Get the directory containing the executable in PyInstaller bundle
-            if getattr(sys, 'frozen', False):
-                application_path = os.path.dirname(sys.executable)
-            else:
-                application_path = os.path.dirname(os.path.abspath(__file__))
-            
-            data_file = os.path.join(application_path, "data.json")
+            data_file = self.data_file_path("data.json")
             if os.path.exists(data_file):
                 with open(data_file, 'r', encoding='utf-8') as f:
                     loaded_data = json.load(f)
@@ -665,24 +1084,10 @@ class QLVTApp:
                     loaded_bookmarks = loaded_data.get("bookmarks", [])
                 
                 # Add preprocessing fields
-                self.items = []
-                for item in loaded_items:
-                    self.items.append({
-                        "code": item["code"],
-                        "name": item["name"],
-                        "code_lower": item["code"].lower(),
-                        "name_lower": item["name"].lower()
-                    })
+                self.items = [make_item(item) for item in loaded_items]
                 
                 # Load bookmarks
-                self.bookmarked_items = []
-                for item in loaded_bookmarks:
-                    self.bookmarked_items.append({
-                        "code": item["code"],
-                        "name": item["name"],
-                        "code_lower": item["code"].lower(),
-                        "name_lower": item["name"].lower()
-                    })
+                self.bookmarked_items = [make_item(item) for item in loaded_bookmarks]
                 
                 # Build search index
                 self.build_search_index()
@@ -694,6 +1099,8 @@ class QLVTApp:
 
 
 if __name__ == "__main__":
+    # Required for the index worker processes in the PyInstaller build
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = QLVTApp(root)
     root.mainloop()